@@ -0,0 +1,97 @@
+# Batched Command Replay (Simulation Workloads)
+
+import numpy as np
+
+from robot_controller import Command, RobotController, DIR_TRIG, UNIT_TO_M
+
+try:
+    from numba import njit
+except ImportError:  # Optional: the kernel then runs as plain Python over the same arrays
+    njit = None
+
+# Numeric command ids; NOOP rows (STOP, invalid or unrecognised commands) change nothing
+NOOP_ID, MOVE_ID, ROTATE_ID, GRAB_ID = 0.0, 1.0, 2.0, 3.0
+COMMAND_IDS = {'MOVE': MOVE_ID, 'ROTATE': ROTATE_ID, 'GRAB': GRAB_ID}
+
+# Direction ids index the DX/DY step tables
+DIRECTION_NAMES = tuple(DIR_TRIG)
+DIRECTION_IDS = {name: float(i) for i, name in enumerate(DIRECTION_NAMES)}
+DX = np.array([DIR_TRIG[name][0] for name in DIRECTION_NAMES])
+DY = np.array([DIR_TRIG[name][1] for name in DIRECTION_NAMES])
+RIGHT_ID = DIRECTION_IDS['RIGHT']
+UNKNOWN_DIRECTION_ID = -1.0
+
+
+def _batch_execute(commands, state):
+    """
+    Replays an (N, 4) array of [cmd_id, dir_id, value, unit_factor] rows on a
+    [x, y, angle, gripper_closed] state vector and returns the final state.
+    """
+    x, y, angle, gripper_closed = state[0], state[1], state[2], state[3]
+
+    for i in range(commands.shape[0]):
+        c = commands[i, 0]
+        d = commands[i, 1]
+        v = commands[i, 2]
+        if c == MOVE_ID:
+            if d >= 0:
+                distance_m = v * commands[i, 3]
+                x += DX[int(d)] * distance_m
+                y += DY[int(d)] * distance_m
+        elif c == ROTATE_ID:
+            angle += v if d == RIGHT_ID else -v
+        elif c == GRAB_ID:
+            gripper_closed = 1.0
+
+    out = np.empty(4)
+    out[0], out[1], out[2], out[3] = x, y, angle, gripper_closed
+    return out
+
+
+# With Numba installed the kernel is compiled eagerly (explicit signature) and cached on disk
+batch_execute = njit("f8[:](f8[:,:], f8[:])", cache=True, fastmath=True)(_batch_execute) if njit else _batch_execute
+
+
+def encode_commands(command_objs: list) -> np.ndarray:
+    """
+    Converts Command objects (or legacy command dicts) into the kernel's numeric rows.
+
+    Validation mirrors execute_command: a MOVE with a missing slot or an unsupported
+    unit, a ROTATE without an angle, and unrecognised commands all become NOOP rows.
+    """
+    commands = np.zeros((len(command_objs), 4))
+
+    for i, command_obj in enumerate(command_objs):
+        if isinstance(command_obj, dict):
+            command_obj = Command.from_dict(command_obj)
+        command_id = COMMAND_IDS.get(command_obj.command, NOOP_ID)
+
+        if command_id == MOVE_ID:
+            factor = UNIT_TO_M.get(command_obj.unit)
+            if command_obj.direction is None or command_obj.value is None or command_obj.unit is None or factor is None:
+                continue
+            commands[i] = (MOVE_ID, DIRECTION_IDS.get(command_obj.direction, UNKNOWN_DIRECTION_ID),
+                           command_obj.value, factor)
+        elif command_id == ROTATE_ID:
+            if command_obj.value is None:
+                continue
+            commands[i] = (ROTATE_ID, DIRECTION_IDS.get(command_obj.direction or 'RIGHT', UNKNOWN_DIRECTION_ID),
+                           command_obj.value, 1.0)
+        else:
+            commands[i, 0] = command_id
+
+    return commands
+
+
+def simulate_commands(command_objs: list, robot: RobotController) -> RobotController:
+    """
+    Replays a command sequence on the robot in one kernel call, without feedback.
+
+    Final poses match executing the commands one by one with execute_command.
+    """
+    state = np.array([robot.x, robot.y, robot.angle, 1.0 if robot.gripper_state == 'closed' else 0.0])
+    x, y, angle, gripper_closed = batch_execute(encode_commands(command_objs), state)
+
+    robot.x, robot.y, robot.angle = float(x), float(y), float(angle)
+    robot.gripper_state = 'closed' if gripper_closed else 'open'
+    return robot
@@ -0,0 +1,14 @@
+# Shared Vocabulary Constants (used by Phase 2 fuzzy matching and Phase 3 parsing)
+#
+# Kept free of heavy imports so either phase can load it without pulling in the other.
+
+# Spelled-out quantities -> numeric text. The single word-to-number table:
+# the parser resolves values through it and fuzzy_matching builds its
+# quantifier lexicon entries from it.
+WORD2NUM = {
+    'one': '1',
+    'two': '2',
+    'three': '3',
+    'ten': '10',
+    'half': '0.5',
+}
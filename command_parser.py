@@ -1,16 +1,35 @@
+import bisect
+import functools
+import itertools
+import os
+import re
+import sys
+
 import spacy
+from spacy.matcher import Matcher
+from spacy.strings import hash_string
+
+from command_constants import WORD2NUM
+from robot_controller import Command
 
-# Load the small English model for SpaCy
 try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("SpaCy model 'en_core_web_sm' not found. Please run:")
-    print("python -m spacy download en_core_web_sm")
-    exit()
+    import hyperscan
+except ImportError:  # Optional: batches are then scanned with COMMAND_PATTERN
+    hyperscan = None
 
 # Dictionaries (Ground Truth)
-STANDARD_ACTIONS = {'move', 'rotate', 'turn', 'stop', 'grab', 'release'}
-STANDARD_DIRECTIONS = {'forward', 'backward', 'left', 'right'}
+STANDARD_ACTIONS = frozenset({'move', 'rotate', 'turn', 'stop', 'grab', 'release'})
+STANDARD_DIRECTIONS = frozenset({'forward', 'backward', 'left', 'right'})
+
+# Inflected action forms -> standard action (stands in for POS tagging + lemmatization)
+ACTION_INFLECTIONS = {
+    'move': 'move', 'moves': 'move', 'moving': 'move', 'moved': 'move',
+    'rotate': 'rotate', 'rotates': 'rotate', 'rotating': 'rotate', 'rotated': 'rotate',
+    'turn': 'rotate', 'turns': 'rotate', 'turning': 'rotate', 'turned': 'rotate',
+    'stop': 'stop', 'stops': 'stop', 'stopping': 'stop', 'stopped': 'stop',
+    'grab': 'grab', 'grabs': 'grab', 'grabbing': 'grab', 'grabbed': 'grab',
+    'release': 'release', 'releases': 'release', 'releasing': 'release', 'released': 'release',
+}
 
 # Unit Standardization Lookup Table
 UNIT_STANDARDS = {
@@ -22,73 +41,368 @@ UNIT_STANDARDS = {
     'degree': 'degrees',
     'degrees': 'degrees',
 }
-ALL_UNIT_TOKENS = set(UNIT_STANDARDS.keys()) | set(UNIT_STANDARDS.values())
+ALL_UNIT_TOKENS = frozenset(UNIT_STANDARDS.keys()) | frozenset(UNIT_STANDARDS.values())
+
+# Shape of every command object; each extractor starts from a copy
+EMPTY_COMMAND_SLOTS = {
+    'command': 'UNKNOWN',
+    'direction': None,
+    'value': None,
+    'unit': None
+}
+
+
+def _alternation(words) -> str:
+    """Builds a regex alternation of whole words, longest first so prefixes never win."""
+    return '|'.join(sorted(map(re.escape, words), key=len, reverse=True))
+
+
+# Signed integers and decimals, including the leading-dot form ("-5", "+2", ".5", "4.5")
+NUMBER_PATTERN = r"[-+]?(?:\d+(?:\.\d+)?|\.\d+)"
+UNIT_ALTERNATION = _alternation(ALL_UNIT_TOKENS)
+
+# Value slot with its optional unit. A number must be a whole token: it may not
+# continue a word or another number, nor run on into "1,000", "1/2", "1.2.3" or
+# "1e3" (a glued unit such as "90degrees" is allowed). Such tokens yield no value,
+# as in the spaCy pass, instead of a misread prefix.
+VALUE_EXPRESSION = (
+    rf"(?P<value>(?<![\w.,/+-]){NUMBER_PATTERN}(?=(?:{UNIT_ALTERNATION})\b|(?!\w|[.,/]\d))"
+    rf"|\b(?:{_alternation(WORD2NUM)})\b)(?:\s*(?P<unit>{UNIT_ALTERNATION})\b)?"
+)
+VALUE_PATTERN = re.compile(VALUE_EXPRESSION)
+
+# Regular command grammar, generated from the same tables as the spaCy matcher.
+# Each match fills exactly one slot group, so slots may appear in any order.
+COMMAND_PATTERN = re.compile(
+    rf"\b(?P<action>{_alternation(ACTION_INFLECTIONS)})\b"
+    rf"|\b(?P<direction>{_alternation(STANDARD_DIRECTIONS)})\b"
+    rf"|{VALUE_EXPRESSION}"
+)  # Matched against lowercased input
+
+# The same grammar as one Hyperscan database, used to scan whole (lowercased) batches at once.
+# Hyperscan has no lookaround, so the value expression only finds candidate starts;
+# each candidate is then confirmed (and its unit read) with VALUE_PATTERN.
+HS_ACTION, HS_DIRECTION, HS_VALUE = range(3)
+HS_EXPRESSIONS = [
+    rf"\b(?:{_alternation(ACTION_INFLECTIONS)})\b",
+    rf"\b(?:{_alternation(STANDARD_DIRECTIONS)})\b",
+    rf"{NUMBER_PATTERN}|\b(?:{_alternation(WORD2NUM)})\b",
+]
+HS_SEPARATOR = b'\0'  # Joins batch inputs; a non-word byte, so \b still holds at input edges
+
+if hyperscan is not None:
+    HS_DATABASE = hyperscan.Database()
+    HS_DATABASE.compile(
+        expressions=[expression.encode() for expression in HS_EXPRESSIONS],
+        ids=[HS_ACTION, HS_DIRECTION, HS_VALUE],
+        elements=len(HS_EXPRESSIONS),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(HS_EXPRESSIONS),
+    )
+else:
+    HS_DATABASE = None
+
+# Final slot values keyed by lowercase surface form: each extractor lowercases its
+# input once, after which every slot is a single dict lookup
+ACTION_COMMANDS = {form: action.upper() for form, action in ACTION_INFLECTIONS.items()}
+DIRECTION_COMMANDS = {direction: direction.upper() for direction in STANDARD_DIRECTIONS}
+UNIT_LOOKUP = {unit: UNIT_STANDARDS.get(unit, unit) for unit in ALL_UNIT_TOKENS}
+
+# Hash IDs computed once with spaCy's string hash, so the spaCy pass compares integers
+# (match ids, token.lower) instead of materialising token and label strings
+ACTION_MATCH_ID, DIRECTION_MATCH_ID, VALUE_MATCH_ID, UNIT_MATCH_ID = (
+    hash_string(label) for label in ("ACTION", "DIRECTION", "VALUE", "UNIT"))
+ACTION_BY_HASH = {hash_string(form): command for form, command in ACTION_COMMANDS.items()}
+DIRECTION_BY_HASH = {hash_string(direction): command for direction, command in DIRECTION_COMMANDS.items()}
+UNIT_BY_HASH = {hash_string(unit): standard for unit, standard in UNIT_LOOKUP.items()}
+
+# Short command texts parse fastest in mid-sized batches. Worker processes are only
+# started for large fallbacks; below that, start-up and IPC outweigh the gain.
+PIPE_BATCH_SIZE = 64
+MULTIPROCESS_MIN_INPUTS = 500
+MULTIPROCESS_BATCH_SIZE = 100
+
+# Voice-control sessions repeat the same few phrases, so parsed commands are memoised
+COMMAND_CACHE_SIZE = 2048
+
+
+def match_command_slots(user_input: str) -> dict:
+    """
+    Regex fast path: fills the command slots from one scan of COMMAND_PATTERN.
+    The command stays 'UNKNOWN' when the input contains no known action word.
+    """
+    command_slots = dict(EMPTY_COMMAND_SLOTS)
+
+    for match in COMMAND_PATTERN.finditer(user_input.lower()):
+        action, direction, value = match.group('action', 'direction', 'value')
+
+        if action:
+            if command_slots['command'] == 'UNKNOWN':
+                command_slots['command'] = ACTION_COMMANDS[action]
+        elif direction:
+            if command_slots['direction'] is None:
+                command_slots['direction'] = DIRECTION_COMMANDS[direction]
+        elif command_slots['value'] is None:
+            command_slots['value'] = float(WORD2NUM.get(value, value))
+
+            # The unit only counts when it directly follows the value
+            unit = match.group('unit')
+            if unit:
+                command_slots['unit'] = UNIT_LOOKUP[unit]
+
+    return command_slots
+
+
+def scan_command_slots(user_inputs: list) -> list:
+    """
+    Batch counterpart of match_command_slots backed by Hyperscan.
+
+    All inputs are joined into one buffer and scanned in a single call; the
+    hits are then assigned back to their input and resolved into slots with the
+    same rules as the regex path (first action, first direction, first value and
+    the unit directly after it).
+
+    Hyperscan's \\b and \\d are ASCII-only, so inputs with any non-ASCII character
+    go through match_command_slots instead, keeping both paths in agreement.
+    """
+    command_objects = [None] * len(user_inputs)
+    ascii_indices = []
+    for i, user_input in enumerate(user_inputs):
+        if user_input.isascii():
+            ascii_indices.append(i)
+        else:
+            command_objects[i] = match_command_slots(user_input)
+    if not ascii_indices:
+        return command_objects
+
+    ascii_inputs = [user_inputs[i] for i in ascii_indices]
+    encoded_inputs = [user_input.encode() for user_input in ascii_inputs]
+    buffer = HS_SEPARATOR.join(encoded_inputs).lower()
+    input_starts = list(itertools.accumulate((len(text) + 1 for text in encoded_inputs[:-1]), initial=0))
+
+    # Per input: leftmost (start, end) of the action and direction, longest end on
+    # equal starts; every value candidate start is kept, since a candidate may be rejected
+    first_hits = [{} for _ in encoded_inputs]
+    value_starts = [set() for _ in encoded_inputs]
+
+    def on_match(slot_id, start, end, flags, context):
+        index = bisect.bisect_right(input_starts, start) - 1
+        if slot_id == HS_VALUE:
+            value_starts[index].add(start - input_starts[index])
+        else:
+            best = first_hits[index].get(slot_id)
+            if best is None or start < best[0] or (start == best[0] and end > best[1]):
+                first_hits[index][slot_id] = (start, end)
+
+    HS_DATABASE.scan(buffer, match_event_handler=on_match)
+
+    for index, hits in enumerate(first_hits):
+        command_slots = dict(EMPTY_COMMAND_SLOTS)
+
+        if HS_ACTION in hits:
+            start, end = hits[HS_ACTION]
+            command_slots['command'] = ACTION_COMMANDS[buffer[start:end].decode()]
+
+        if HS_DIRECTION in hits:
+            start, end = hits[HS_DIRECTION]
+            command_slots['direction'] = DIRECTION_COMMANDS[buffer[start:end].decode()]
+
+        # The first candidate VALUE_PATTERN accepts is the value, with its unit
+        text = ascii_inputs[index].lower()
+        for start in sorted(value_starts[index]):
+            match = VALUE_PATTERN.match(text, start)
+            if match:
+                value, unit = match.group('value', 'unit')
+                command_slots['value'] = float(WORD2NUM.get(value, value))
+                if unit:
+                    command_slots['unit'] = UNIT_LOOKUP[unit]
+                break
+
+        command_objects[ascii_indices[index]] = command_slots
+
+    return command_objects
+
+
+@functools.cache
+def _get_nlp():
+    """
+    Builds the spaCy pipeline on first use instead of at import, then warms it up
+    so the first real command does not pay the one-off initialisation cost.
+
+    Blank English pipeline: only the tokenizer runs, with no tok2vec/tagger forward
+    pass. Verb forms and numbers are recognised from the token text itself.
+    """
+    nlp = spacy.blank("en")
+    nlp("warmup")
+    return nlp
+
+
+@functools.cache
+def _get_matcher() -> Matcher:
+    """Compiles the slot patterns once; matching runs in Cython over the Doc's token array."""
+    matcher = Matcher(_get_nlp().vocab)
+    matcher.add("ACTION", [[{"LOWER": {"IN": sorted(ACTION_INFLECTIONS)}}]])
+    matcher.add("DIRECTION", [[{"LOWER": {"IN": sorted(STANDARD_DIRECTIONS)}}]])
+    matcher.add("VALUE", [[{"LIKE_NUM": True}], [{"LOWER": {"IN": sorted(WORD2NUM)}}]])
+    matcher.add("UNIT", [[{"LOWER": {"IN": sorted(ALL_UNIT_TOKENS)}}]])
+    return matcher
 
 
 def process_with_spacy(text: str):
     """Runs text through the SpaCy pipeline to get linguistic features."""
-    doc = nlp(text)
-    return doc, [(ent.text, ent.label_) for ent in doc.ents]
+    return _get_nlp()(text)
 
 
 def extract_command_slots(doc, fuzzy_tokens: list) -> dict:
     """
     Two-Pass Slot Extraction: Robustly extracts command, direction, value, and unit.
     """
-    command_slots = {
-        'command': 'UNKNOWN',
-        'direction': None,
-        'value': None,
-        'unit': None
-    }
+    command_slots = dict(EMPTY_COMMAND_SLOTS)
+
+    # A single matcher pass (native code) finds every slot candidate as a
+    # (match_id, start, end) span; the Python loop below only sees those few hits
+    matches = _get_matcher()(doc)
+    first_match = {}  # earliest token index per ACTION / DIRECTION match id
+    value_starts = set()
+    unit_starts = set()
+    past_end = len(doc)
+
+    for match_id, start, _ in matches:
+        if match_id == VALUE_MATCH_ID:
+            value_starts.add(start)
+        elif match_id == UNIT_MATCH_ID:
+            unit_starts.add(start)
+        elif start < first_match.get(match_id, past_end):
+            first_match[match_id] = start
 
     # --- PASS 1: FIND ACTION (Intent) ---
-    for token in doc:
-        # Find the main action verb
-        if token.pos_ == "VERB" and token.lemma_ in STANDARD_ACTIONS:
-            command_slots['command'] = token.lemma_.upper()
-            break
+    # Find the main action verb
+    if ACTION_MATCH_ID in first_match:
+        command_slots['command'] = ACTION_BY_HASH[doc[first_match[ACTION_MATCH_ID]].lower]
 
-            # --- PASS 2: FIND DIRECTION, VALUE, AND UNIT (Iterate all tokens) ---
-    for i, token in enumerate(doc):
-        token_text_lower = token.text.lower()
+    # --- PASS 2: FIND DIRECTION, VALUE, AND UNIT ---
+    # Find Direction
+    if DIRECTION_MATCH_ID in first_match:
+        command_slots['direction'] = DIRECTION_BY_HASH[doc[first_match[DIRECTION_MATCH_ID]].lower]
 
-        # Find Direction
-        if command_slots['direction'] is None and token_text_lower in STANDARD_DIRECTIONS:
-            command_slots['direction'] = token_text_lower.upper()
+    # Find Value
+    for i in sorted(value_starts):
+        # 1. Value Extraction: number words resolve through WORD2NUM,
+        # anything else must parse as a float (e.g. '1,000' is skipped)
+        value = doc[i].lower_
+        try:
+            command_slots['value'] = float(WORD2NUM.get(value, value))
+        except ValueError:
+            continue
 
-        # Find Value
-        is_numeric = token.pos_ == 'NUM' or token.ent_type_ == 'CARDINAL'
+        # 2. Unit Extraction: Look at the token following the number, skipping the
+        # whitespace tokens spaCy emits for runs of spaces or tabs (as COMMAND_PATTERN's \s*)
+        j = i + 1
+        while j < past_end and doc[j].is_space:
+            j += 1
+        if j in unit_starts:
+            # Standardized unit looked up by hash: e.g., 'centimeters' -> 'cm'
+            command_slots['unit'] = UNIT_BY_HASH[doc[j].lower]
 
-        if is_numeric and command_slots['value'] is None:
+        # Only one action/parameter set per command, so stop at the first value
+        break
+
+    # Final fallback for Command if not found via Verb
+    if command_slots['command'] == 'UNKNOWN' and fuzzy_tokens:
+        first_token = fuzzy_tokens[0].lower()
+        if first_token in STANDARD_ACTIONS:
+            # Same action table as the matcher, so e.g. 'turn' still resolves to ROTATE
+            command_slots['command'] = ACTION_COMMANDS[first_token]
 
-            # 1. Value Extraction
-            try:
-                command_slots['value'] = float(token_text_lower.replace('a', '1').replace('an', '1'))
-            except ValueError:
-                continue
+    return command_slots
 
-                # 2. Unit Extraction: Look at the token immediately following the number (i + 1)
-            if (i + 1) < len(doc):
-                next_token = doc[i + 1].text.lower()
 
-                if next_token in ALL_UNIT_TOKENS:
-                    # Perform standardization lookup: e.g., 'centimeters' -> 'cm'
-                    command_slots['unit'] = UNIT_STANDARDS.get(next_token, next_token)
+def _to_command(command_slots: dict) -> Command:
+    """Freezes a slot dict into a Command, interning its string slots."""
+    direction = command_slots['direction']
+    unit = command_slots['unit']
+    return Command(
+        command=sys.intern(command_slots['command']),
+        direction=sys.intern(direction) if direction else None,
+        value=command_slots['value'],
+        unit=sys.intern(unit) if unit else None,
+    )
 
-                    # Since we found a value/unit pair, we can stop searching for slots
-                    # (This implicitly assumes only one action/parameter set per command)
-                    # We break the inner for loop here, but allow the outer one to finish if necessary.
 
-    # Final fallback for Command if not found via Verb
-    if command_slots['command'] == 'UNKNOWN' and fuzzy_tokens and fuzzy_tokens[0].lower() in STANDARD_ACTIONS:
-        command_slots['command'] = fuzzy_tokens[0].upper()
+def generate_command_object(user_input: str, fuzzy_tokens: list) -> Command:
+    """
+    Wrapper function to generate the final command object.
+
+    Results are cached on (user_input, fuzzy_tokens); Command is frozen, so a
+    cached command cannot be altered by one of its callers.
+    """
+    return _generate_cached_command_object(user_input, tuple(fuzzy_tokens))
+
+
+@functools.lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def _generate_cached_command_object(user_input: str, fuzzy_tokens: tuple) -> Command:
+    command_object = match_command_slots(user_input)
+
+    # Only inputs without a recognised action word go through the spaCy pass
+    if command_object['command'] == 'UNKNOWN':
+        doc = process_with_spacy(user_input)
+        command_object = extract_command_slots(doc, fuzzy_tokens)
+
+    return _to_command(command_object)
+
+
+def _usable_cpu_count() -> int:
+    """Counts the cores this process may run on (os.cpu_count() ignores CPU affinity)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _pipe_process_count(fallback_count: int) -> int:
+    """Default nlp.pipe worker count: all but one core, only for large fallbacks."""
+    if fallback_count < MULTIPROCESS_MIN_INPUTS:
+        return 1
+    return max(1, _usable_cpu_count() - 1)
+
+
+def generate_command_objects(user_inputs: list, fuzzy_tokens_list: list, n_process: int = None) -> list:
+    """
+    Batch version of generate_command_object.
+
+    The batch is scanned with Hyperscan when it is installed (COMMAND_PATTERN
+    otherwise). Inputs the grammar cannot resolve are streamed through nlp.pipe together,
+    so the pipeline is dispatched once per batch instead of once per command.
+
+    n_process sets the number of nlp.pipe worker processes. By default the pipe
+    stays in-process unless at least MULTIPROCESS_MIN_INPUTS inputs fall back,
+    in which case all but one CPU core are used. Worker processes may be started
+    with 'spawn', which re-imports the calling script, so multiprocess callers must
+    run under an ``if __name__ == "__main__":`` guard (see the example below).
+    """
+    if HS_DATABASE is not None and user_inputs:
+        command_objects = scan_command_slots(user_inputs)
+    else:
+        command_objects = [match_command_slots(user_input) for user_input in user_inputs]
+    fallback_indices = [i for i, command_object in enumerate(command_objects) if command_object['command'] == 'UNKNOWN']
+
+    if not fallback_indices:
+        return [_to_command(command_object) for command_object in command_objects]
+
+    if n_process is None:
+        n_process = _pipe_process_count(len(fallback_indices))
+    batch_size = PIPE_BATCH_SIZE if n_process == 1 else MULTIPROCESS_BATCH_SIZE
+
+    docs = _get_nlp().pipe([user_inputs[i] for i in fallback_indices], batch_size=batch_size, n_process=n_process)
+    for i, doc in zip(fallback_indices, docs):
+        command_objects[i] = extract_command_slots(doc, fuzzy_tokens_list[i])
+
+    return [_to_command(command_object) for command_object in command_objects]
 
-    return command_slots
 
+# --- Example: Batch Parsing with Worker Processes ---
 
-def generate_command_object(user_input: str, fuzzy_tokens: list) -> dict:
-    """Wrapper function to generate the final command object."""
-    doc, _ = process_with_spacy(user_input)
-    command_object = extract_command_slots(doc, fuzzy_tokens)
-    return command_object
\ No newline at end of file
+if __name__ == "__main__":
+    # The guard keeps spawned nlp.pipe workers from re-running this block on import
+    sample_inputs = ["move forward 50 centimeters", "turn left 45 degrees", "robot, forward 10 cm please"]
+    sample_tokens = [text.split() for text in sample_inputs]
+    for command_object in generate_command_objects(sample_inputs * 200, sample_tokens * 200, n_process=2)[:3]:
+        print(command_object)
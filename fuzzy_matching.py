@@ -1,6 +1,11 @@
-import Levenshtein as lev
-from fuzzywuzzy import fuzz
+import functools
+from collections import defaultdict
+from types import MappingProxyType
+
+from rapidfuzz import fuzz
+from rapidfuzz.process import extractOne
 import Preprocessing as process
+from command_constants import WORD2NUM
 
 # --- GROUND TRUTH (Standard Definitions) ---
 # Dictionaries imported from Preprocessing.py
@@ -10,7 +15,8 @@ print(process.STANDARD_ROBOT_PARAMETERS)
 # --- Create the Comprehensive Reference Lexicon ---
 # This maps user synonyms/variants (keys) to the Standard Robot Term (values).
 # It's built upon the Phase 1 Ground Truth for all recognized tokens.
-REFERENCE_COMMAND_LEXICON = {
+# Read-only, so importers cannot change the vocabulary derived from it below
+REFERENCE_COMMAND_LEXICON = MappingProxyType({
     # Actions Synonyms (User term: Standard term)
     'go': 'move',
     'advance': 'move',
@@ -29,22 +35,58 @@ REFERENCE_COMMAND_LEXICON = {
     'degree': 'degrees',
 
     # Specific Parameter/Quantifier Mapping (Example: for parameter extraction)
-    'ten': '10',
-    'half': '0.5',
-    'one': '1',
-    'two': '2',
-    'three': '3',
+    # Number words come from the shared WORD2NUM table
+    **WORD2NUM,
     'half a meter': '0.5 meter'
-}
+})
+_LEXICON_KEYS = frozenset(REFERENCE_COMMAND_LEXICON)
 
 # Extract all standard terms (values) for efficient fuzzy comparison
-STANDARD_VOCABULARY = set(REFERENCE_COMMAND_LEXICON.values())
-STANDARD_VOCABULARY.update(REFERENCE_COMMAND_LEXICON.keys())  # Include original keys too
+STANDARD_VOCABULARY = frozenset(REFERENCE_COMMAND_LEXICON.values()) | _LEXICON_KEYS  # Include original keys too
+# Ordered by length (then alphabetically) so score ties always resolve the same way
+STANDARD_VOCABULARY_LIST = tuple(sorted(STANDARD_VOCABULARY, key=lambda word: (len(word), word)))
+VOCAB_SET_LOWER = frozenset(standard_word.lower() for standard_word in STANDARD_VOCABULARY)  # Exact-hit fast path
+
+# Standard words bucketed by length. fuzz.ratio can only reach a threshold t when
+# 200 * min(len_a, len_b) / (len_a + len_b) >= t, so most lengths never need scoring.
+VOCAB_BY_LEN = defaultdict(list)
+for standard_word in STANDARD_VOCABULARY_LIST:
+    VOCAB_BY_LEN[len(standard_word)].append(standard_word)
 
 
 # --- Fuzzy String Matching Implementation ---
 
-def get_standard_word(token: str, vocabulary: set, threshold: int = 85) -> str:
+FUZZY_MATCH_THRESHOLD = 85  # Minimum fuzz.ratio score (0-100) for a correction
+TOKEN_CACHE_SIZE = 8192  # Distinct raw tokens whose correction is memoised
+
+
+def _is_number(token: str) -> bool:
+    """Checks for plain integer or decimal strings such as '10' or '0.5'."""
+    integer_part, _, fraction_part = token.partition('.')
+    return integer_part.isdigit() and (not fraction_part or fraction_part.isdigit())
+
+
+@functools.lru_cache(maxsize=None)
+def _length_candidates(length: int, threshold: int) -> tuple:
+    """
+    Returns the standard words whose length still allows a fuzz.ratio >= threshold.
+
+    Each (length, threshold) pair is built once, so extractOne is handed the same
+    prebuilt tuple on every later call.
+    """
+    if threshold <= 0:
+        return STANDARD_VOCABULARY_LIST
+
+    shortest = -(-threshold * length // (200 - threshold))  # ceil without float rounding
+    longest = (200 - threshold) * length // threshold
+
+    candidates = []
+    for size in range(shortest, longest + 1):
+        candidates.extend(VOCAB_BY_LEN.get(size, ()))
+    return tuple(candidates)
+
+
+def get_standard_word(token: str, vocabulary: set, threshold: int = FUZZY_MATCH_THRESHOLD) -> str:
     """
     Compares a user token against a set of standard vocabulary using fuzzy matching.
 
@@ -56,37 +98,51 @@ def get_standard_word(token: str, vocabulary: set, threshold: int = 85) -> str:
     Returns:
         str: The standardized word if score >= threshold, otherwise the original token.
     """
-    best_match = token
-    highest_ratio = 0
+    # Already-standard tokens (the bulk of clean input) need neither lowercasing nor scoring
+    if token in vocabulary:
+        return token
+
+    normalized_token = token.lower()
+
+    # Plain numbers are never corrected towards a nearby number
+    if _is_number(normalized_token):
+        return token
+
+    # Clean tokens are already standard words, so they skip the fuzzy sweep entirely.
+    # Otherwise only words of a compatible length are scored; extractOne then runs
+    # that sweep in C and skips candidates below score_cutoff. The standard words are
+    # already lowercase, so that sweep needs no per-choice Python processor call
+    if vocabulary is STANDARD_VOCABULARY:
+        if normalized_token in VOCAB_SET_LOWER:
+            return normalized_token
+        choices = _length_candidates(len(normalized_token), threshold)
+        match = extractOne(normalized_token, choices, scorer=fuzz.ratio, score_cutoff=threshold)
+    else:
+        match = extractOne(token, vocabulary, scorer=fuzz.ratio, processor=str.lower, score_cutoff=threshold)
 
-    # Using fuzz.ratio (Levenshtein distance similarity) for single-word matching
-    for standard_word in vocabulary:
-        # Calculate the simple fuzzy ratio
-        ratio = fuzz.ratio(token.lower(), standard_word.lower())
+    # Return the best match if it meets the threshold
+    return match[0] if match else token
 
-        if ratio > highest_ratio:
-            highest_ratio = ratio
 
-            # Check for the minimum similarity threshold
-            if highest_ratio >= threshold:
-                best_match = standard_word
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _correct_token(token: str) -> str:
+    """Memoised get_standard_word against the standard vocabulary."""
+    return get_standard_word(token, STANDARD_VOCABULARY)
 
-    # Return the best match if it meets the threshold
-    return best_match if highest_ratio >= threshold else token
+
+# Seed the cache with every standard word so clean tokens are a single cache hit
+for standard_word in STANDARD_VOCABULARY_LIST:
+    _correct_token(standard_word)
 
 
 def fuzzy_correct_sentence(processed_tokens: list) -> list:
     """
     Applies fuzzy correction to every token in the preprocessed list.
-    """
-    corrected_tokens = []
 
-    for token in processed_tokens:
-        # Correct the token using the global standard vocabulary
-        corrected_token = get_standard_word(token, STANDARD_VOCABULARY)
-        corrected_tokens.append(corrected_token)
-
-    return corrected_tokens
+    Each distinct token is corrected once; repeats are served from the
+    _correct_token cache.
+    """
+    return [_correct_token(token) for token in processed_tokens]
 
 
 # --- Command Template Matching (Initial) ---
@@ -1,14 +1,20 @@
 import unittest
+from dataclasses import FrozenInstanceError
+from unittest import mock
 # Import the functions/classes from your project modules
 # NOTE: Replace 'your_module_name' with the actual filenames you created.
-from robot_controller import RobotController, execute_command
+from robot_controller import Command, RobotController, decode_command, execute_command
+from batch_simulation import simulate_commands
 from fuzzy_matching import fuzzy_correct_sentence, REFERENCE_COMMAND_LEXICON  # Assuming Phase 2 file
-from command_parser import generate_command_object  # Assuming Phase 3 file
+import command_parser
+from command_parser import (generate_command_object, generate_command_objects, match_command_slots,
+                            scan_command_slots, extract_command_slots, process_with_spacy,
+                            HS_DATABASE, MULTIPROCESS_MIN_INPUTS)  # Assuming Phase 3 file
 
 # Mock Data (Simulated Phase 1 output for testing Phase 2/3)
 MOCK_INPUT_CLEAN = "move the robot forward ten centimeters"
-MOCK_INPUT_FUZZY = ['move', 'the', 'robot', 'forwerd', 'ten', 'centimetars']  # Simulating output of Phase 1
-MOCK_INPUT_SLANG = ['rotate', 'it', '90', 'degerees', 'plz']
+MOCK_INPUT_FUZZY = ('move', 'the', 'robot', 'forwerd', 'ten', 'centimetars')  # Simulating output of Phase 1
+MOCK_INPUT_SLANG = ('rotate', 'it', '90', 'degerees', 'plz')
 
 
 class TestFuzzyMatching(unittest.TestCase):
@@ -35,6 +41,19 @@ class TestFuzzyMatching(unittest.TestCase):
         expected = ['banana']
         self.assertEqual(fuzzy_correct_sentence(tokens), expected)
 
+    def test_numeric_tokens_no_correction(self):
+        # Integers and decimals skip the fuzzy sweep and are returned unchanged
+        tokens = ['10', '0.5', '2.5', '100']
+        self.assertEqual(fuzzy_correct_sentence(tokens), tokens)
+
+    def test_mock_sentences_correction(self):
+        # Misspellings in the Phase 1 mocks are corrected; clean, numeric and unknown tokens pass through.
+        # The second pass is served from the per-token cache and must give the same result
+        tokens = MOCK_INPUT_FUZZY + MOCK_INPUT_SLANG
+        expected = ['move', 'the', 'robot', 'forward', 'ten', 'centimeter', 'rotate', 'it', '90', 'degrees', 'plz']
+        self.assertEqual(fuzzy_correct_sentence(tokens), expected)
+        self.assertEqual(fuzzy_correct_sentence(tokens), expected)
+
 
 class TestParserLogic(unittest.TestCase):
     """
@@ -42,42 +61,127 @@ class TestParserLogic(unittest.TestCase):
     Ensures final Command Object is correct and standardized.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        # Build and warm the spaCy pipeline once, before the first timed parser test
+        generate_command_object("warmup", ("warmup",))
+
     def test_move_forward_command(self):
         # Raw input for SpaCy
         raw_input = "move forward 50 centimeters"
-        fuzzy_tokens = ['move', 'forward', '50', 'cm']
+        fuzzy_tokens = ('move', 'forward', '50', 'cm')
 
         result = generate_command_object(raw_input, fuzzy_tokens)
 
-        self.assertEqual(result['command'], 'MOVE')
+        self.assertEqual(result.command, 'MOVE')
         # Expect float value from conversion
-        self.assertAlmostEqual(result['value'], 50.0)
+        self.assertAlmostEqual(result.value, 50.0)
         # EXPECT THE STANDARDIZED UNIT 'cm'
-        self.assertEqual(result['unit'], 'cm') # PASSES with fixed parser
-        self.assertEqual(result['direction'], 'FORWARD')
+        self.assertEqual(result.unit, 'cm') # PASSES with fixed parser
+        self.assertEqual(result.direction, 'FORWARD')
 
     def test_rotate_left_command(self):
         # Test a rotation command
         raw_input = "turn left 45 degrees"
-        fuzzy_tokens = ['rotate', 'left', '45', 'degrees']
+        fuzzy_tokens = ('rotate', 'left', '45', 'degrees')
 
         result = generate_command_object(raw_input, fuzzy_tokens)
 
-        self.assertEqual(result['command'], 'ROTATE')
-        self.assertAlmostEqual(result['value'], 45.0)
+        self.assertEqual(result.command, 'ROTATE')
+        self.assertAlmostEqual(result.value, 45.0)
         # EXPECT THE STANDARDIZED UNIT 'degrees'
-        self.assertEqual(result['unit'], 'degrees') # PASSES with fixed parser
-        self.assertEqual(result['direction'], 'LEFT')
+        self.assertEqual(result.unit, 'degrees') # PASSES with fixed parser
+        self.assertEqual(result.direction, 'LEFT')
+
+    def test_misspelled_turn_falls_back_to_rotate(self):
+        # A misspelled verb falls back to the corrected first token, which resolves like the matcher
+        raw_input = "turnn left 45 degrees"
+        fuzzy_tokens = ('turn', 'left', '45', 'degrees')
+
+        result = generate_command_object(raw_input, fuzzy_tokens)
+
+        self.assertEqual(result.command, 'ROTATE')
+        self.assertEqual(result.direction, 'LEFT')
+
+    def test_spelled_out_value_command(self):
+        # Number words resolve through the parser's WORD2NUM table
+        raw_input = "move backward half meter"
+        fuzzy_tokens = ('move', 'backward', 'half', 'meter')
+
+        result = generate_command_object(raw_input, fuzzy_tokens)
+
+        self.assertAlmostEqual(result.value, 0.5)
+        self.assertEqual(result.unit, 'meter')
 
     def test_simple_stop_command(self):
         # This test ensures basic intent classification works (it was likely already passing)
         raw_input = "stop immediately"
-        fuzzy_tokens = ['stop', 'immediately']
+        fuzzy_tokens = ('stop', 'immediately')
 
         result = generate_command_object(raw_input, fuzzy_tokens)
 
-        self.assertEqual(result['command'], 'STOP')
-        self.assertIsNone(result.get('value'))
+        self.assertEqual(result.command, 'STOP')
+        self.assertIsNone(result.value)
+
+    def test_regex_path_matches_spacy_path(self):
+        # The compiled regex grammar must fill the same slots as the spaCy matcher pass
+        raw_inputs = ["Move the robot forward by 10 cm", "turn right 90 degrees", "rotate 30.5 degrees left",
+                      "grab it", "move backward 2 meters now", "move forward ten centimeters",
+                      # Signed, leading-dot and malformed numbers: parsed whole or not at all
+                      "move -5 cm", "move forward .5 meter", "move +2 cm", "move 1,000 cm", "move 1e3 cm",
+                      "rotate 1/2 degrees", "move 1.2.3 cm", "move forward 10. cm", "move ten, then stop",
+                      # Extra whitespace between value and unit
+                      "forward 10  cm", "forward 10\tcm", "move forward 10 \n cm"]
+
+        for raw_input in raw_inputs:
+            doc = process_with_spacy(raw_input)
+            self.assertEqual(match_command_slots(raw_input), extract_command_slots(doc, []), raw_input)
+
+    @unittest.skipIf(HS_DATABASE is None, "hyperscan is not installed")
+    def test_hyperscan_path_matches_regex_path(self):
+        # The batched Hyperscan scan must fill the same slots as COMMAND_PATTERN, non-ASCII input included
+        raw_inputs = ["Move the robot forward by 10 cm", "rotate 90degrees", "move -5 cm", "move 1,000 cm",
+                      "move forward .5 meter", "émove forward 10 cm", "move \uff15 cm", "move 10\xa0cm",
+                      "turn left 45 degrees\x1ccm", "", "stop"]
+
+        self.assertEqual(scan_command_slots(raw_inputs), [match_command_slots(raw) for raw in raw_inputs])
+
+    def test_repeated_command_is_cached(self):
+        # Re-issuing an identical phrase must return the cached object without re-parsing
+        first = generate_command_object("stop now", ('stop', 'now'))
+        second = generate_command_object("stop now", ('stop', 'now'))
+
+        self.assertIs(first, second)
+        with self.assertRaises(FrozenInstanceError):
+            first.command = 'MOVE'
+
+    def test_batch_matches_single_commands(self):
+        # The nlp.pipe batch path must produce the same objects as one-by-one parsing
+        raw_inputs = ["move forward 50 centimeters", "turn left 45 degrees", "stop immediately"]
+        fuzzy_tokens_list = [('move', 'forward', '50', 'cm'), ('rotate', 'left', '45', 'degrees'), ('stop', 'immediately')]
+
+        results = generate_command_objects(raw_inputs, fuzzy_tokens_list)
+
+        expected = [generate_command_object(raw, toks) for raw, toks in zip(raw_inputs, fuzzy_tokens_list)]
+        self.assertEqual(results, expected)
+
+    def test_multiprocess_batch_matches_serial(self):
+        # nlp.pipe worker processes must produce the same objects as the in-process pipe
+        raw_inputs = ["forward 10 cm please", "the robot, left 45 degrees", "move forward 50 cm"] * 4
+        fuzzy_tokens_list = [tuple(raw.split()) for raw in raw_inputs]
+
+        serial = generate_command_objects(raw_inputs, fuzzy_tokens_list, n_process=1)
+
+        self.assertEqual(generate_command_objects(raw_inputs, fuzzy_tokens_list, n_process=2), serial)
+        self.assertEqual(generate_command_objects([], [], n_process=2), [])
+
+    def test_large_fallback_uses_worker_processes(self):
+        # By default, worker processes are only used once MULTIPROCESS_MIN_INPUTS inputs fall back
+        with mock.patch.object(command_parser, '_usable_cpu_count', return_value=4):
+            self.assertEqual(command_parser._pipe_process_count(MULTIPROCESS_MIN_INPUTS - 1), 1)
+            self.assertEqual(command_parser._pipe_process_count(MULTIPROCESS_MIN_INPUTS), 3)
+        with mock.patch.object(command_parser, '_usable_cpu_count', return_value=1):
+            self.assertEqual(command_parser._pipe_process_count(MULTIPROCESS_MIN_INPUTS), 1)
 
 
 class TestRobotController(unittest.TestCase):
@@ -86,13 +190,18 @@ class TestRobotController(unittest.TestCase):
     Ensures the correct robot function is called and state is updated.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        # One RobotController is shared by the class instead of being rebuilt per test
+        cls.robot = RobotController()
+
     def setUp(self):
-        # Create a new RobotController instance before each test
-        self.robot = RobotController()
+        # Each test starts from the initial state
+        self.robot.reset()
 
     def test_move_updates_state(self):
         # Test that a move command updates the internal state
-        cmd = {'command': 'MOVE', 'direction': 'FORWARD', 'value': 100.0, 'unit': 'cm'}
+        cmd = Command('MOVE', direction='FORWARD', value=100.0, unit='cm')
         execute_command(cmd, self.robot)
 
         # 100cm = 1m (based on the controller's internal logic)
@@ -101,15 +210,86 @@ class TestRobotController(unittest.TestCase):
 
     def test_rotate_updates_angle(self):
         # Test that a rotate command updates the angle
-        cmd = {'command': 'ROTATE', 'direction': 'RIGHT', 'value': 45.0, 'unit': 'degrees'}
+        cmd = Command('ROTATE', direction='RIGHT', value=45.0, unit='degrees')
         execute_command(cmd, self.robot)
 
         self.assertAlmostEqual(self.robot.angle, 45.0)
 
+    def test_feedback_reports_state_at_execution(self):
+        # Feedback is a plain string describing the state right after its own command
+        first = execute_command(Command('MOVE', direction='FORWARD', value=100.0, unit='cm'), self.robot)
+        execute_command(Command('MOVE', direction='RIGHT', value=2.0, unit='meter'), self.robot)
+
+        self.assertIsInstance(first, str)
+        self.assertEqual(first, "Simulated: Moving robot FORWARD by 100.0 cm. New state: "
+                                "Position: (0.00, 1.00), Orientation: 0.00 degrees, Gripper: open")
+
+    def test_batch_simulation_matches_execute_command(self):
+        # The vectorised replay must land on the same final state as one-by-one execution
+        commands = [Command('MOVE', direction='FORWARD', value=100.0, unit='cm'),
+                    Command('ROTATE', direction='LEFT', value=30.0, unit='degrees'),
+                    Command('MOVE', direction='LEFT', value=2.0, unit='meter'),
+                    Command('MOVE', direction='RIGHT', value=5.0, unit='yards'),
+                    Command('MOVE', direction='BACKWARD', unit='cm'),
+                    {'command': 'ROTATE', 'value': 90.0},
+                    Command('GRAB'), Command('STOP')]
+        for command in commands:
+            execute_command(command, self.robot)
+
+        replayed = simulate_commands(commands, RobotController())
+        for attribute in ('x', 'y', 'angle', 'gripper_state'):
+            self.assertEqual(getattr(replayed, attribute), getattr(self.robot, attribute), attribute)
+
+    def test_quiet_feedback_still_updates_state(self):
+        # With verbose feedback off, commands report "OK" but still move the robot
+        self.robot.set_verbose(False)
+        self.addCleanup(self.robot.set_verbose, True)
+        feedback = execute_command(Command('MOVE', direction='BACKWARD', value=50.0, unit='cm'), self.robot)
+
+        self.assertEqual(feedback, "OK")
+        self.assertAlmostEqual(self.robot.y, -0.5)
+
+        # The setting belongs to this controller only
+        self.assertNotEqual(execute_command(Command('ROTATE', value=10.0), RobotController()), "OK")
+
+        # Switching back restores the full message text
+        self.robot.set_verbose(True)
+        feedback = execute_command(Command('ROTATE', direction='RIGHT', value=45.0, unit='degrees'), self.robot)
+        self.assertEqual(feedback, "Simulated: Rotating robot RIGHT by 45.0 degrees. New angle: 45.00.")
+
+    def test_reset_restores_initial_state(self):
+        # reset() must return a used controller to the same state as a fresh one
+        execute_command(Command('MOVE', direction='LEFT', value=3.0, unit='meter'), self.robot)
+        execute_command(Command('GRAB'), self.robot)
+        self.robot.reset()
+
+        self.assertEqual(self.robot.get_current_state(), RobotController().get_current_state())
+
+    def test_zero_angle_rotate_is_not_missing(self):
+        # A 0-degree rotation is a valid command, not a missing angle
+        feedback = execute_command(Command('ROTATE', direction='LEFT', value=0.0, unit='degrees'), self.robot)
+
+        self.assertNotIn("Error", feedback)
+        self.assertAlmostEqual(self.robot.angle, 0.0)
+
+    def test_decode_json_command(self):
+        # JSON payloads decode into validated Command objects ready for execution
+        cmd = decode_command(b'{"command": "MOVE", "direction": "RIGHT", "value": 25, "unit": "cm"}')
+        self.assertEqual(cmd, Command('MOVE', direction='RIGHT', value=25.0, unit='cm'))
+
+        execute_command(cmd, self.robot)
+        self.assertAlmostEqual(self.robot.x, 0.25)
+
+        out_of_range = b'{"command": "MOVE", "value": 1' + b'0' * 400 + b'}'
+        for payload in (b'{"direction": "LEFT"}', b'{"command": "MOVE", "value": "far"}', b'not json', out_of_range,
+                        b'{"command": "MOVE", "value": 1e400}', b'{"command": "MOVE", "value": NaN}'):
+            with self.assertRaises(ValueError):
+                decode_command(payload)
+
     def test_error_handling_missing_slot(self):
         # Test the robustness (Error Handling) of the execution logic
         # Missing 'value' for a MOVE command
-        cmd = {'command': 'MOVE', 'direction': 'FORWARD', 'unit': 'cm'}
+        cmd = Command('MOVE', direction='FORWARD', unit='cm')
         feedback = execute_command(cmd, self.robot)
 
         self.assertTrue("Error: MOVE command missing" in feedback)
@@ -117,11 +297,24 @@ class TestRobotController(unittest.TestCase):
 
     def test_error_handling_unrecognized_command(self):
         # Test an unknown command
-        cmd = {'command': 'DANCE'}
+        cmd = Command('DANCE')
         feedback = execute_command(cmd, self.robot)
 
         self.assertTrue("not recognized" in feedback)
 
+    def test_legacy_dict_command(self):
+        # Plain command dictionaries are still accepted through Command.from_dict
+        cmd = {'command': 'MOVE', 'direction': 'LEFT', 'value': 50.0, 'unit': 'cm'}
+        execute_command(cmd, self.robot)
+
+        self.assertAlmostEqual(self.robot.x, -0.5)
+
+        # A dictionary without a command is reported, not raised, as in the dict-based controller
+        for cmd in ({}, {'direction': 'LEFT'}):
+            feedback = execute_command(cmd, self.robot)
+            self.assertEqual(feedback, "Error: Command 'None' not recognized by the Robot Controller.")
+        self.assertAlmostEqual(simulate_commands([{}], RobotController()).x, 0.0)
+
 
 # --- Execution Block ---
 if __name__ == '__main__':
@@ -1,24 +1,133 @@
+import json
+import math
+from dataclasses import dataclass, fields
+from typing import Optional
+
+try:
+    import msgspec
+except ImportError:  # Optional: decode_command then falls back to json + manual checks
+    msgspec = None
+
+
+# Standardized Command Object (Output of Phase 3)
+
+@dataclass(slots=True, frozen=True)
+class Command:
+    """A parsed robot command; slots the parser could not fill stay None."""
+    command: str
+    direction: Optional[str] = None
+    value: Optional[float] = None
+    unit: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, command_dict: dict) -> 'Command':
+        """
+        Builds a Command from a legacy command dictionary, ignoring unknown keys.
+        A missing 'command' becomes None, which execute_command reports as not recognized.
+        """
+        slots = {f.name: command_dict[f.name] for f in fields(cls) if f.name in command_dict}
+        slots.setdefault('command', None)
+        return cls(**slots)
+
+
+# Typed decoder for commands arriving as JSON (IPC, sockets, logs)
+_COMMAND_DECODER = msgspec.json.Decoder(Command) if msgspec is not None else None
+
+
+def decode_command(raw) -> Command:
+    """
+    Parses and validates one JSON command object (bytes or str) into a Command.
+
+    Raises:
+        ValueError: If the payload is not valid JSON, lacks 'command', or a slot
+            has the wrong type.
+    """
+    if _COMMAND_DECODER is not None:
+        try:
+            return _COMMAND_DECODER.decode(raw)
+        except msgspec.DecodeError as err:
+            raise ValueError(f"Invalid command payload: {err}") from err
+
+    command_dict = json.loads(raw)
+    if not isinstance(command_dict, dict) or not isinstance(command_dict.get('command'), str):
+        raise ValueError("Invalid command payload: expected an object with a string 'command'")
+    for slot in ('direction', 'unit'):
+        if not isinstance(command_dict.get(slot), (str, type(None))):
+            raise ValueError(f"Invalid command payload: '{slot}' must be a string or null")
+
+    value = command_dict.get('value')
+    if value is not None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("Invalid command payload: 'value' must be a number or null")
+        try:
+            value = float(value)
+        except OverflowError as err:  # Integers beyond float range, as msgspec rejects them
+            raise ValueError("Invalid command payload: 'value' out of range") from err
+        if not math.isfinite(value):  # 1e400 or the non-standard NaN/Infinity literals
+            raise ValueError("Invalid command payload: 'value' out of range")
+        command_dict['value'] = value
+
+    return Command.from_dict(command_dict)
+
+
+# Simulated Feedback Messages
+
+# Returned by successful moves and rotations of a controller with verbose feedback off
+_OK = "OK"
+
+
 # STEP 1: Robot/API Abstraction Layer
 
+# Distance unit -> meters
+UNIT_TO_M = {'cm': 0.01, 'meter': 1.0, 'm': 1.0, 'mm': 0.001}
+
+# Movement direction -> (cos, sin) of its bearing, i.e. the unit (dx, dy) step on
+# the simulation plane. Precomputed for the cardinals, so no trig runs per move
+DIR_TRIG = {'FORWARD': (0.0, 1.0), 'BACKWARD': (0.0, -1.0), 'RIGHT': (1.0, 0.0), 'LEFT': (-1.0, 0.0)}
+
+
 class RobotController:
     """
     Acts as the interface between the NLP output (Command Object)
     and the simulated robot's actual control signals.
     """
+    __slots__ = ('x', 'y', 'angle', 'gripper_state', 'verbose')
 
-    def __init__(self):
+    def __init__(self, verbose: bool = True):
         # Initialize internal state variables for simulation feedback
+        self.verbose = verbose
+        self.reset()
+
+    def set_verbose(self, enabled: bool):
+        """
+        Switches this controller's descriptive move/rotate feedback on (default) or
+        off, e.g. for simulation loops. When off, those commands return "OK".
+        """
+        self.verbose = bool(enabled)
+
+    def reset(self):
+        """
+        Returns the simulated robot to its initial pose and gripper state in place,
+        e.g. between test cases or simulation episodes. The feedback setting is kept.
+        """
         self.x = 0.0
         self.y = 0.0
         self.angle = 0.0
         self.gripper_state = 'open'
 
     def _update_state(self, dx=0, dy=0, da=0):
-        """Internal helper to update the robot's simulated position."""
+        """
+        Helper to update the robot's simulated position. The control methods
+        apply their deltas inline; this remains for external callers.
+        """
         self.x += dx
         self.y += dy
         self.angle += da
 
+    def _state_tuple(self) -> tuple:
+        """Raw (x, y, angle, gripper_state) snapshot, for consumers that do not need text."""
+        return (self.x, self.y, self.angle, self.gripper_state)
+
     def get_current_state(self) -> str:
         """Provides feedback on the robot's current position and state."""
         return f"Position: ({self.x:.2f}, {self.y:.2f}), Orientation: {self.angle:.2f} degrees, Gripper: {self.gripper_state}"
@@ -31,27 +140,19 @@ class RobotController:
         (PHASE 4, STEP 2: Integration with Robot Simulation)
         """
         # Convert all distance values to a common unit (e.g., meters)
-        if unit == 'cm':
-            distance_m = value / 100.0
-        elif unit == 'meter':
-            distance_m = value
-        else:
+        factor = UNIT_TO_M.get(unit)
+        if factor is None:
             return f"Error: Unit '{unit}' not supported for movement."
+        distance_m = value * factor
 
         # Simplified 2D movement simulation
-        dx, dy = 0, 0
-        if direction == 'FORWARD':
-            dy = distance_m
-        elif direction == 'BACKWARD':
-            dy = -distance_m
-        elif direction == 'RIGHT':
-            dx = distance_m
-        elif direction == 'LEFT':
-            dx = -distance_m
-
-        self._update_state(dx=dx, dy=dy)
+        cx, cy = DIR_TRIG.get(direction, (0.0, 0.0))
+        self.x += cx * distance_m
+        self.y += cy * distance_m
 
         # Simulated Feedback
+        if not self.verbose:
+            return _OK
         return f"Simulated: Moving robot {direction} by {value} {unit}. New state: {self.get_current_state()}"
 
     def rotate_robot(self, angle: float, direction: str) -> str:
@@ -60,9 +161,11 @@ class RobotController:
         """
         # Assume angle is always in degrees for simplicity
         rotation = angle if direction == 'RIGHT' else -angle
-        self._update_state(da=rotation)
+        self.angle += rotation
 
         # Simulated Feedback
+        if not self.verbose:
+            return _OK
         return f"Simulated: Rotating robot {direction} by {angle} degrees. New angle: {self.angle:.2f}."
 
     def halt_robot(self) -> str:
@@ -77,50 +180,59 @@ class RobotController:
 
 # STEP 3 & 4: Execution Logic and Feedback Mechanism
 
-def execute_command(command_obj: dict, robot: RobotController) -> str:
-    """
-    The final interpreter function that executes the command object.
+def _do_move(command_obj: Command, robot: RobotController) -> str:
+    direction = command_obj.direction
+    value = command_obj.value
+    unit = command_obj.unit
 
-    Args:
-        command_obj (dict): The standardized command dictionary from Phase 3.
-        robot (RobotController): The instance of the robot controller.
+    # Check for required slots before execution (Robustness check)
+    if direction is None or value is None or unit is None:
+        return "Error: MOVE command missing direction, value, or unit."
 
-    Returns:
-        str: Feedback message to the user.
-    """
+    # Execute the method in the RobotController class
+    return robot.move_robot(direction, value, unit)
 
-    command = command_obj.get('command')
 
-    # 1. Dispatch based on the primary command
-    if command == 'MOVE':
-        direction = command_obj.get('direction')
-        value = command_obj.get('value')
-        unit = command_obj.get('unit')
+def _do_rotate(command_obj: Command, robot: RobotController) -> str:
+    direction = command_obj.direction or 'RIGHT'  # Default direction if not specified
+    value = command_obj.value
 
-        # Check for required slots before execution (Robustness check)
-        if not all([direction, value, unit]):
-            return "Error: MOVE command missing direction, value, or unit."
+    if value is None:
+        return "Error: ROTATE command missing angle value."
 
-        # Execute the method in the RobotController class
-        return robot.move_robot(direction, value, unit)
+    return robot.rotate_robot(value, direction)
 
-    elif command == 'ROTATE':
-        direction = command_obj.get('direction', 'RIGHT')  # Default direction if not specified
-        value = command_obj.get('value')
 
-        if not value:
-            return "Error: ROTATE command missing angle value."
+# Primary command -> handler; execute_command dispatches with a single lookup
+_DISPATCH = {
+    'MOVE': _do_move,
+    'ROTATE': _do_rotate,
+    'STOP': lambda command_obj, robot: robot.halt_robot(),
+    'GRAB': lambda command_obj, robot: robot.grab_object(),
+}
 
-        return robot.rotate_robot(value, direction)
 
-    elif command == 'STOP':
-        return robot.halt_robot()
+def execute_command(command_obj: Command, robot: RobotController) -> str:
+    """
+    The final interpreter function that executes the command object.
 
-    elif command == 'GRAB':
-        return robot.grab_object()
+    Args:
+        command_obj (Command): The standardized command object from Phase 3
+            (a legacy command dictionary is converted with Command.from_dict).
+        robot (RobotController): The instance of the robot controller.
+
+    Returns:
+        str: Feedback message to the user.
+    """
+    if isinstance(command_obj, dict):
+        command_obj = Command.from_dict(command_obj)
+
+    # 1. Dispatch based on the primary command
+    handler = _DISPATCH.get(command_obj.command)
+    if handler is None:
+        return f"Error: Command '{command_obj.command}' not recognized by the Robot Controller."
 
-    else:
-        return f"Error: Command '{command}' not recognized by the Robot Controller."
+    return handler(command_obj, robot)
 
 
 # --- Example Integration and Testing ---
@@ -132,25 +244,25 @@ if __name__ == "__main__":
     print(f"Initial State: {robot_instance.get_current_state()}\n")
 
     # Example 1: Movement Command (Output of Phase 3)
-    cmd1 = {'command': 'MOVE', 'direction': 'FORWARD', 'value': 20.0, 'unit': 'cm'}
+    cmd1 = Command('MOVE', direction='FORWARD', value=20.0, unit='cm')
     feedback1 = execute_command(cmd1, robot_instance)
     print(f"Command 1: {cmd1}")
     print(f"Feedback: {feedback1}\n")
 
     # Example 2: Rotation Command
-    cmd2 = {'command': 'ROTATE', 'direction': 'RIGHT', 'value': 90.0, 'unit': 'degrees'}
+    cmd2 = Command('ROTATE', direction='RIGHT', value=90.0, unit='degrees')
     feedback2 = execute_command(cmd2, robot_instance)
     print(f"Command 2: {cmd2}")
     print(f"Feedback: {feedback2}\n")
 
     # Example 3: Unrecognized Unit (Error Handling)
-    cmd3 = {'command': 'MOVE', 'direction': 'LEFT', 'value': 5.0, 'unit': 'yards'}
+    cmd3 = Command('MOVE', direction='LEFT', value=5.0, unit='yards')
     feedback3 = execute_command(cmd3, robot_instance)
     print(f"Command 3: {cmd3}")
     print(f"Feedback: {feedback3}\n")
 
     # Example 4: Simple Action
-    cmd4 = {'command': 'GRAB'}
+    cmd4 = Command('GRAB')
     feedback4 = execute_command(cmd4, robot_instance)
     print(f"Command 4: {cmd4}")
     print(f"Feedback: {feedback4}\n")